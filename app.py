@@ -1,13 +1,10 @@
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
 from datetime import datetime
-import bcrypt
-import json
-import os
 import io
-import psycopg2
+import psycopg2.extras
 from sqlalchemy import text
 import google.generativeai as genai
 
@@ -15,21 +12,43 @@ import google.generativeai as genai
 genai.configure(api_key=st.secrets["generative_ai"]["gemini_api_key"])
 
 # --- Constants ---
-BUDGET_FILE = "budget.json"
+DEFAULT_TAGS = ('Mercado', 'Feira', 'Conveniência', 'Restaurante/Bar', 'iFood', 'Farmácia', 'Transporte', 'Casa', 'Pet', 'Outros')
+PAGE_SIZE = 50
 
 # --- Database Connection ---
-conn = st.connection("neon_db", type="sql")
+@st.cache_resource
+def get_conn():
+    return st.connection("neon_db", type="sql")
+
+conn = get_conn()
+
+# Encoded once at import; password_entered does a dict lookup per attempt
+_HASHES = {user: pw_hash.encode('utf-8') for user, pw_hash in st.secrets["passwords"].items()}
+
+# Checked when the username is unknown, so both login paths cost one bcrypt
+# verification and timing can't enumerate valid usernames
+_DUMMY_HASH = b"$2b$10$N9qo8uLOickgx2ZMRZoMyeIjZAgcfl7p92ldGxad68LJZdL17lhWy"
+
+# Shared expenses are split evenly among all registered users
+TOTAL_USERS = max(len(_HASHES), 1)
 
 # --- Budget Functions ---
 def load_budget():
-    if os.path.exists(BUDGET_FILE):
-        with open(BUDGET_FILE, "r") as f:
-            return json.load(f)
-    return {}
+    # Session copy first: a save in this session skips the DB round-trip
+    if "_budgets" in st.session_state:
+        return st.session_state["_budgets"]
+    df = conn.query("SELECT usuario, amount FROM budgets", ttl=60)
+    return dict(zip(df["usuario"], df["amount"]))
 
 def save_budget(budgets):
-    with open(BUDGET_FILE, "w") as f:
-        json.dump(budgets, f)
+    st.session_state["_budgets"] = budgets
+    username = st.session_state["username"]
+    with conn.session as session:
+        session.execute(text(
+            "INSERT INTO budgets (usuario, amount) VALUES (:usuario, :amount)"
+            " ON CONFLICT (usuario) DO UPDATE SET amount = EXCLUDED.amount"
+        ), {"usuario": username, "amount": float(budgets.get(username, 0.0))})
+        session.commit()
 
 # --- App Configuration ---
 st.set_page_config(
@@ -39,6 +58,17 @@ st.set_page_config(
 )
 
 # --- Authentication ---
+def hash_password(password, rounds=10):
+    """Hash a password for storage in st.secrets["passwords"].
+
+    Cost 10 keeps interactive logins fast on this single-household
+    deployment; raise it if the hashes ever leave st.secrets.
+    """
+    import bcrypt
+
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
 def check_password():
     """Returns `True` if the user had the correct password."""
 
@@ -51,16 +81,21 @@ def check_password():
 
     def password_entered():
         """Checks whether a password entered by the user is correct."""
-        if st.session_state["username"] in st.secrets["passwords"]:
-            hashed_password = st.secrets["passwords"][st.session_state["username"]].encode('utf-8')
-            if bcrypt.checkpw(st.session_state["password"].encode('utf-8'), hashed_password):
-                st.session_state["password_correct"] = True
-                del st.session_state["password"]  # don't store password
-            else:
-                st.session_state["password_correct"] = False
+        import bcrypt  # deferred: only needed on an actual login attempt
+
+        username = st.session_state["username"]
+        hashed_password = _HASHES.get(username, _DUMMY_HASH)
+        if bcrypt.checkpw(st.session_state["password"].encode('utf-8'), hashed_password) and username in _HASHES:
+            st.session_state["password_correct"] = True
+            st.session_state["auth_user"] = username
+            del st.session_state["password"]  # don't store password
         else:
             st.session_state["password_correct"] = False
 
+    if "auth_user" in st.session_state:
+        # Already authenticated in this session, skip re-validation.
+        return True
+
     if "password_correct" not in st.session_state:
         # First run, show login form.
         login_form()
@@ -76,8 +111,9 @@ def check_password():
 
 
 # --- Data Functions ---
-def load_data():
-    # Create table if it doesn't exist
+@st.cache_resource
+def init_schema():
+    # Create table if it doesn't exist (runs once per server process)
     with conn.session as session:
         session.execute(text("""
             CREATE TABLE IF NOT EXISTS expenses (
@@ -90,12 +126,110 @@ def load_data():
                 usuario TEXT
             )
         """))
+        session.execute(text("""
+            CREATE TABLE IF NOT EXISTS budgets (
+                usuario TEXT PRIMARY KEY,
+                amount REAL
+            )
+        """))
+        # Indexes for the per-user, per-date and shared-expense filters;
+        # the partial index only stores rows where compartilhado is true
+        session.execute(text("CREATE INDEX IF NOT EXISTS ix_expenses_usuario ON expenses(usuario)"))
+        session.execute(text("CREATE INDEX IF NOT EXISTS ix_expenses_data ON expenses(data)"))
+        session.execute(text("CREATE INDEX IF NOT EXISTS ix_expenses_shared ON expenses(compartilhado) WHERE compartilhado"))
         session.commit()
-    df = conn.query("SELECT * FROM expenses", ttl=0)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_expenses(username):
+    df = conn.query(
+        "SELECT id, nome, tag, data, valor, compartilhado, usuario FROM expenses"
+        " WHERE usuario = :usuario OR compartilhado",
+        params={"usuario": username},
+        ttl=0,
+    )
     df["data"] = pd.to_datetime(df["data"])
+    # Compact dtypes: integer-code compares for the string columns,
+    # real bool masks instead of object equality scans
+    df["tag"] = df["tag"].astype("category")
+    df["usuario"] = df["usuario"].astype("category")
+    df["compartilhado"] = df["compartilhado"].fillna(False).astype("bool")
+    df["valor"] = pd.to_numeric(df["valor"], downcast="float")
+    df["id"] = pd.to_numeric(df["id"], downcast="unsigned")
     # Don't set id as index, keep it as a regular column
     return df
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_monthly_agg(username):
+    # Aggregate server-side: metrics and charts only need per-month
+    # per-tag sums, so transfer O(months x tags) rows instead of O(rows)
+    df = conn.query(
+        "SELECT date_trunc('month', data) AS mes, tag, compartilhado, usuario,"
+        " SUM(valor) AS valor FROM expenses"
+        " WHERE usuario = :usuario OR compartilhado"
+        " GROUP BY 1, 2, 3, 4",
+        params={"usuario": username},
+        ttl=0,
+    )
+    df["mes"] = pd.to_datetime(df["mes"])
+    # Month label precomputed here so reruns don't repeat the conversion;
+    # strftime on datetime64 is vectorized and sorts chronologically
+    df["mes_ano"] = df["mes"].dt.strftime("%Y-%m").astype("category")
+    df["tag"] = df["tag"].astype("category")
+    df["usuario"] = df["usuario"].astype("category")
+    df["compartilhado"] = df["compartilhado"].fillna(False).astype("bool")
+    return df
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _fetch_editor_page(username, page):
+    # Only one page of rows crosses the wire and reaches the editor;
+    # plain string dtypes on purpose so new rows aren't category-bound
+    df = conn.query(
+        "SELECT id, nome, tag, data, valor, compartilhado, usuario FROM expenses"
+        " WHERE usuario = :usuario OR compartilhado"
+        " ORDER BY data DESC, id DESC LIMIT :limit OFFSET :offset",
+        params={"usuario": username, "limit": PAGE_SIZE, "offset": page * PAGE_SIZE},
+        ttl=0,
+    )
+    df["data"] = pd.to_datetime(df["data"])
+    df["compartilhado"] = df["compartilhado"].fillna(False).astype("bool")
+    return df
+
+def load_data():
+    init_schema()
+    return _fetch_expenses(st.session_state["username"])
+
+def load_editor_page(page):
+    init_schema()
+    return _fetch_editor_page(st.session_state["username"], page)
+
+def load_monthly_agg():
+    init_schema()
+    return _fetch_monthly_agg(st.session_state["username"])
+
+# Above this many rows COPY beats even a batched INSERT
+COPY_THRESHOLD = 200
+
+def bulk_insert(session, rows_df):
+    """Insert expense rows (nome, tag, data, valor, compartilhado, usuario)."""
+    cursor = session.connection().connection.cursor()
+    if len(rows_df) > COPY_THRESHOLD:
+        # Stream the batch as CSV; skips per-row parse/plan overhead
+        buf = io.StringIO()
+        rows_df.to_csv(buf, index=False, header=False)
+        buf.seek(0)
+        cursor.copy_expert(
+            "COPY expenses (nome, tag, data, valor, compartilhado, usuario)"
+            " FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+    else:
+        psycopg2.extras.execute_values(
+            cursor,
+            "INSERT INTO expenses (nome, tag, data, valor, compartilhado, usuario) VALUES %s",
+            list(rows_df.itertuples(index=False, name=None)),
+            page_size=500,
+        )
+
 def save_data():
     if "expense_data_editor" not in st.session_state:
         st.warning("Nenhuma alteração detectada.")
@@ -106,69 +240,84 @@ def save_data():
         added_rows = st.session_state.expense_data_editor.get('added_rows', [])
         deleted_rows = st.session_state.expense_data_editor.get('deleted_rows', [])
 
-        
+        # One snapshot of the page the editor displayed, to resolve row
+        # indices to ids for both branches below
+        df = load_editor_page(st.session_state.get("editor_page", 0))
 
-        # Handle deletions
+        # Handle deletions — resolve all ids first, delete in one statement
         if deleted_rows:
-            for row_index in deleted_rows:
-                # Get the actual ID from the original dataframe using the row index
-                df = load_data()
-                if row_index < len(df):
-                    row_id = int(df.iloc[row_index]['id'])  # Convert to Python int
-                    session.execute(text("DELETE FROM expenses WHERE id = :id"), {"id": row_id})
+            ids = [int(df.iloc[row_index]['id']) for row_index in deleted_rows if row_index < len(df)]
+            if ids:
+                session.execute(text("DELETE FROM expenses WHERE id = ANY(:ids)"), {"ids": ids})
             st.success(f"{len(deleted_rows)} despesa(s) deletada(s) com sucesso!")
 
-        # Handle additions
+        # Handle additions — one multi-row INSERT instead of a round-trip per row
         if added_rows:
-            for row_data in added_rows:
-                # Ensure 'usuario' is set for new rows
-                if 'usuario' not in row_data or not row_data['usuario']:
-                    row_data['usuario'] = st.session_state["username"]
-                
-                # Remove 'id' from row_data for new insertions, as it's SERIAL PRIMARY KEY
-                if 'id' in row_data:
-                    del row_data['id']
-
-                # Convert pandas/numpy types to Python types
-                clean_row_data = {}
-                for key, value in row_data.items():
-                    if hasattr(value, 'item'):  # numpy types have .item() method
-                        clean_row_data[key] = value.item()
-                    else:
-                        clean_row_data[key] = value
-
-                session.execute(text("""
-                    INSERT INTO expenses (nome, tag, data, valor, compartilhado, usuario)
-                    VALUES (:nome, :tag, :data, :valor, :compartilhado, :usuario)
-                """), clean_row_data)
+            columns = ("nome", "tag", "data", "valor", "compartilhado", "usuario")
+            # Bulk dtype casts instead of a per-cell hasattr/item loop;
+            # 'id' is SERIAL and simply not selected here
+            rows_df = pd.DataFrame(added_rows).reindex(columns=list(columns))
+            rows_df["valor"] = pd.to_numeric(rows_df["valor"], errors="coerce")
+            rows_df["compartilhado"] = rows_df["compartilhado"].fillna(False).astype("bool")
+            rows_df["data"] = pd.to_datetime(rows_df["data"], errors="coerce").dt.date
+            rows_df["usuario"] = rows_df["usuario"].replace("", np.nan).fillna(st.session_state["username"])
+            # astype(object) converts numpy scalars to plain Python values
+            # in one pass; missing cells become NULLs
+            rows_df = rows_df.astype(object).where(rows_df.notna(), None)
+
+            bulk_insert(session, rows_df)
             st.success(f"{len(added_rows)} despesa(s) adicionada(s) com sucesso!")
 
-        # Handle edits
+        # Handle edits — group rows by which columns changed and update each
+        # group with a single set-based statement
         if edited_rows:
-            df = load_data()
+            def _to_python(col_name, value):
+                # Convert pandas/numpy types to Python types
+                if hasattr(value, 'item'):  # numpy types have .item() method
+                    value = value.item()
+                # Typed date literal so the VALUES join compares cleanly
+                if col_name == 'data' and isinstance(value, str):
+                    value = datetime.strptime(value, "%Y-%m-%d").date()
+                return value
+
+            groups = {}
             for row_index, changes in edited_rows.items():
                 # Get the actual ID from the original dataframe using the row index
-                if int(row_index) < len(df):
-                    row_id = int(df.iloc[int(row_index)]['id'])  # Convert to Python int
-                    
-                    # Construct the UPDATE query dynamically
-                    set_clauses = []
-                    params = {"id": row_id}
-                    for col_name, new_value in changes.items():
-                        if col_name != 'id':  # Don't update the ID column
-                            set_clauses.append(f"{col_name} = :{col_name}")
-                            # Convert pandas/numpy types to Python types
-                            if hasattr(new_value, 'item'):  # numpy types have .item() method
-                                params[col_name] = new_value.item()
-                            else:
-                                params[col_name] = new_value
-                    
-                    if set_clauses: # Only execute if there are changes
-                        query = text(f"UPDATE expenses SET {', '.join(set_clauses)} WHERE id = :id")
-                        session.execute(query, params)
+                if int(row_index) >= len(df):
+                    continue
+                row_id = int(df.iloc[int(row_index)]['id'])  # Convert to Python int
+                cols = tuple(sorted(c for c in changes if c != 'id'))  # Don't update the ID column
+                if cols:
+                    values = tuple(_to_python(c, changes[c]) for c in cols)
+                    groups.setdefault(cols, []).append((row_id,) + values)
+
+            # Explicit casts in the VALUES template: a column whose batch is
+            # all NULLs would otherwise resolve to text and fail assignment
+            casts = {"data": "::date", "valor": "::real", "compartilhado": "::boolean"}
+
+            cursor = session.connection().connection.cursor()
+            for cols, rows in groups.items():
+                set_sql = ", ".join(f"{col} = v.{col}" for col in cols)
+                cols_sql = ", ".join(cols)
+                template = "(%s" + "".join(f", %s{casts.get(col, '')}" for col in cols) + ")"
+                psycopg2.extras.execute_values(
+                    cursor,
+                    f"UPDATE expenses SET {set_sql} FROM (VALUES %s) AS v (id, {cols_sql})"
+                    " WHERE expenses.id = v.id",
+                    rows,
+                    template=template,
+                    page_size=500,
+                )
             st.success(f"{len(edited_rows)} despesa(s) editada(s) com sucesso!")
 
         session.commit()
+        _fetch_expenses.clear()
+        _fetch_monthly_agg.clear()
+        _fetch_editor_page.clear()
+
+    # Drop the applied editor payload so stale edits can't be re-applied
+    # and the dict doesn't grow across the session
+    del st.session_state["expense_data_editor"]
 
 # --- UI Components ---
 def display_header():
@@ -180,7 +329,7 @@ def display_sidebar(df):
     nome = st.sidebar.text_input("Nome")
     tag = st.sidebar.selectbox(
         "Tag",
-        options=df["tag"].unique().tolist() + ['Mercado', 'Feira', 'Conveniência','Restaurante/Bar','iFood', 'Farmácia', 'Transporte', 'Casa','Pet', 'Outros'],
+        options=sorted(set(df["tag"].cat.categories).union(DEFAULT_TAGS)),
     )
     data = st.sidebar.date_input("Data", datetime.now())
     valor = st.sidebar.number_input("Valor", min_value=0.0, format="%.2f")
@@ -202,33 +351,37 @@ def display_sidebar(df):
                     "usuario": st.session_state["username"]
                 })
                 session.commit()
+            _fetch_expenses.clear()
+            _fetch_monthly_agg.clear()
+            _fetch_editor_page.clear()
             st.sidebar.success("Despesa adicionada!")
             st.rerun()
     return df
 
-def display_metrics(df):
+@st.fragment
+def _budget_widget(budgets, user_budget):
+    # Fragment: saving the budget reruns only this block, not main()
+    st.header("Definir Orçamento")
+    new_budget = st.number_input("Definir Orçamento Mensal", min_value=0.0, value=user_budget, format="%.2f")
+    if st.button("Salvar Orçamento"):
+        budgets[st.session_state["username"]] = new_budget
+        save_budget(budgets)
+        st.success(f"Orçamento mensal definido para R$ {new_budget:,.2f}")
+
+def display_metrics(monthly_df, now):
     st.header("Dashboard")
     col1, col2, col3 = st.columns(3)
 
-    # --- Current Month Metrics ---
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    monthly_df = df[
-        (df["data"].dt.month == current_month) & (df["data"].dt.year == current_year)
-    ]
-
     with col1:
-        # Calculate total expenditure considering shared expenses
-        user_expenses = monthly_df[monthly_df["usuario"] == st.session_state["username"]]
-        shared_expenses = monthly_df[monthly_df["compartilhado"] == True]
-        
-        # For user's own expenses, count full amount
-        user_total = user_expenses[user_expenses["compartilhado"] == False]["valor"].sum()
-        
-        # For shared expenses, count user's portion (split among all users)
-        total_users = len(st.secrets["passwords"]) if len(st.secrets["passwords"]) > 0 else 1
-        shared_total = shared_expenses["valor"].sum() / total_users
-        
+        # Calculate total expenditure considering shared expenses —
+        # one grouped pass over valor instead of three boolean masks
+        is_me = monthly_df["usuario"] == st.session_state["username"]
+        sums = monthly_df.groupby([is_me, monthly_df["compartilhado"]], observed=True)["valor"].sum()
+
+        # Own expenses count in full; shared ones (whoever paid) are split
+        user_total = sums.get((True, False), 0.0)
+        shared_total = (sums.get((True, True), 0.0) + sums.get((False, True), 0.0)) / TOTAL_USERS
+
         total_expenditure = user_total + shared_total
         st.markdown("<p style='margin-bottom: 0.2rem;'><strong>Gasto Mensal Atual</strong></p>", unsafe_allow_html=True)
         st.markdown(f"<h2 style='color: white; margin-top: 0;'>R$ {total_expenditure:,.2f}</h2>", unsafe_allow_html=True)
@@ -245,100 +398,98 @@ def display_metrics(df):
 
     with col3:
         if not monthly_df.empty:
-            current_day = datetime.now().day
-            average_daily_expense = total_expenditure / current_day
+            average_daily_expense = total_expenditure / now.day
             st.markdown("<p style='margin-bottom: 0.2rem;'><strong>Média Diária</strong></p>", unsafe_allow_html=True)
             st.markdown(f"<h2 style='color: white; margin-top: 0;'>R$ {average_daily_expense:,.2f}</h2>", unsafe_allow_html=True)
         else:
             st.markdown("<p style='margin-bottom: 0.2rem;'><strong>Média Diária</strong></p>", unsafe_allow_html=True)
             st.markdown(f"<h2 style='color: white; margin-top: 0;'>R$ 0,00</h2>", unsafe_allow_html=True)
     
-    st.header("Definir Orçamento")
-    new_budget = st.number_input("Definir Orçamento Mensal", min_value=0.0, value=user_budget, format="%.2f")
-    if st.button("Salvar Orçamento"):
-        budgets[st.session_state["username"]] = new_budget
-        save_budget(budgets)
-        st.success(f"Orçamento mensal definido para R$ {new_budget:,.2f}")
-        st.rerun()
+    _budget_widget(budgets, user_budget)
 
-def display_charts(df):
-    st.header("Visualizações")
+@st.cache_data(show_spinner=False)
+def _bar_chart(expenses_by_month):
+    import plotly.express as px  # deferred: login screen renders no charts
 
-    # Apply shared expense logic for charts
-    total_users = len(st.secrets["passwords"]) if len(st.secrets["passwords"]) > 0 else 1
-    
-    # Create adjusted dataframe with split shared expenses
-    df_adjusted = df.copy()
-    # For shared expenses, divide the value by number of users
-    df_adjusted.loc[df_adjusted["compartilhado"] == True, "valor"] = df_adjusted.loc[df_adjusted["compartilhado"] == True, "valor"] / total_users
-    
-    # Filter for current user's expenses (including their share of shared expenses)
-    user_df_adjusted = df_adjusted[(df_adjusted["usuario"] == st.session_state["username"]) | (df_adjusted["compartilhado"] == True)]
-
-    # --- Expenses by Month (Bar Chart) ---
-    user_df_adjusted["mes_ano"] = user_df_adjusted["data"].dt.to_period("M").astype(str)
-    expenses_by_month = (
-        user_df_adjusted.groupby("mes_ano")["valor"].sum().reset_index()
-    )
-    fig_bar = px.bar(
+    return px.bar(
         expenses_by_month,
         x="mes_ano",
         y="valor",
         title="Gastos por Mês",
         labels={"mes_ano": "Mês", "valor": "Valor Total"},
     )
-    st.plotly_chart(fig_bar, use_container_width=True)
+
+@st.cache_data(show_spinner=False)
+def _pie_chart(df, title):
+    import plotly.express as px  # deferred: login screen renders no charts
+
+    return px.pie(
+        df,
+        names="tag",
+        values="valor",
+        title=title,
+    )
+
+@st.fragment
+def display_charts(agg, monthly_agg):
+    st.header("Visualizações")
+
+    def adjust_shared(frame):
+        # For shared expenses, divide the value by number of users —
+        # one vectorized pass, and assign() only copies the valor column
+        share = np.where(frame["compartilhado"], 1.0 / TOTAL_USERS, 1.0)
+        return frame.assign(valor=frame["valor"] * share)
+
+    agg_adjusted = adjust_shared(agg)
+    monthly_agg_adjusted = adjust_shared(monthly_agg)
+
+    # --- Expenses by Month (Bar Chart) ---
+    expenses_by_month = (
+        agg_adjusted.groupby("mes_ano", observed=True)["valor"].sum().reset_index()
+    )
+    st.plotly_chart(_bar_chart(expenses_by_month), use_container_width=True)
 
     # --- Expenses by Tag (Pie Charts) ---
     col1, col2 = st.columns(2)
 
+    # Aggregate by tag server-side so the pies only ship one row per tag
+    monthly_by_tag = monthly_agg_adjusted.groupby("tag", observed=True, as_index=False)["valor"].sum()
+    total_by_tag = agg_adjusted.groupby("tag", observed=True, as_index=False)["valor"].sum()
+
     with col1:
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        monthly_df_adjusted = user_df_adjusted[
-            (user_df_adjusted["data"].dt.month == current_month) & (user_df_adjusted["data"].dt.year == current_year)
-        ]
-        if not monthly_df_adjusted.empty:
-            fig_pie_monthly = px.pie(
-                monthly_df_adjusted,
-                names="tag",
-                values="valor",
-                title="Gastos do Mês Atual por Tag",
+        if not monthly_by_tag.empty:
+            st.plotly_chart(
+                _pie_chart(monthly_by_tag, "Gastos do Mês Atual por Tag"),
+                use_container_width=True,
             )
-            st.plotly_chart(fig_pie_monthly, use_container_width=True)
 
     with col2:
-        if not user_df_adjusted.empty:
-            fig_pie_total = px.pie(
-                user_df_adjusted,
-                names="tag",
-                values="valor",
-                title="Total de Gastos por Tag",
+        if not total_by_tag.empty:
+            st.plotly_chart(
+                _pie_chart(total_by_tag, "Total de Gastos por Tag"),
+                use_container_width=True,
             )
-            st.plotly_chart(fig_pie_total, use_container_width=True)
 
 def display_shared_expenses(df):
     st.header("Despesas Compartilhadas")
-    shared_df = df[df["compartilhado"] == True]
+    shared_df = df[df["compartilhado"]]
 
     if shared_df.empty:
         st.info("Nenhuma despesa compartilhada encontrada.")
         return
 
-    total_shared_expenses = shared_df["valor"].sum()
+    # One pass over valor: per-user sums give both the total and the user's share
+    per_user = shared_df.groupby("usuario", observed=True)["valor"].sum()
+    total_shared_expenses = per_user.sum()
     st.metric("Total de Despesas Compartilhadas", f"R$ {total_shared_expenses:,.2f}")
 
     # Calculate balance
-    user_total = shared_df[shared_df["usuario"] == st.session_state["username"]]["valor"].sum()
-    total_users = len(st.secrets["passwords"])
-    if total_users > 0:
-        balance = user_total - (total_shared_expenses / total_users)
-    else:
-        balance = 0
+    user_total = per_user.get(st.session_state["username"], 0.0)
+    balance = user_total - (total_shared_expenses / TOTAL_USERS)
 
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("Sua parte", f"R$ {total_shared_expenses / total_users:,.2f}")
+        st.metric("Sua parte", f"R$ {total_shared_expenses / TOTAL_USERS:,.2f}")
     with col2:
         if balance > 0:
             st.metric("Você deve receber", f"R$ {balance:,.2f}")
@@ -348,9 +499,11 @@ def display_shared_expenses(df):
     st.dataframe(shared_df, use_container_width=True)
 
 
-def display_data_editor(df):
+def display_data_editor():
     st.header("Todas as Suas Despesas")
-    
+    page = st.number_input("Página", min_value=0, value=0, step=1, key="editor_page")
+    df = load_editor_page(page)
+
     # Configure column settings to make ID read-only
     column_config = {
         "id": st.column_config.NumberColumn(
@@ -425,20 +578,22 @@ def main():
     display_header()
     df = display_sidebar(df)
 
-    # Ensure 'date' column is always in datetime format after loading or adding expenses
-    if "data" in df.columns and not df.empty:
-        df["data"] = pd.to_datetime(df["data"])
-
     # Filter data for the logged in user
-    user_df = df[(df["usuario"] == st.session_state["username"]) | (df["compartilhado"] == True)]
+    user_df = df[(df["usuario"] == st.session_state["username"]) | df["compartilhado"]]
+
+    now = datetime.now()
+
+    # Pre-aggregated month/tag sums; the current month is one scalar compare
+    agg = load_monthly_agg()
+    monthly_agg = agg[agg["mes"] == pd.Timestamp(now.year, now.month, 1)]
 
-    display_metrics(user_df)
-    display_charts(user_df)
+    display_metrics(monthly_agg, now)
+    display_charts(agg, monthly_agg)
     display_shared_expenses(df)
     display_llm_bot(user_df)
     
     # Display data editor
-    edited_user_df = display_data_editor(user_df)
+    edited_user_df = display_data_editor()
 
     
     